@@ -2,8 +2,20 @@ import queue
 import re
 import sqlite3
 import sys
-
-from PyQt5.QtCore import QDateTime, QThread, QTimer, pyqtSignal
+import threading
+
+from PyQt5.QtCore import (
+    QCoreApplication,
+    QDateTime,
+    QEvent,
+    QObject,
+    QRunnable,
+    Qt,
+    QThread,
+    QThreadPool,
+    QTimer,
+    pyqtSignal,
+)
 from PyQt5.QtGui import QGuiApplication, QIcon
 from PyQt5.QtWidgets import (
     QAction,
@@ -15,6 +27,9 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QMenuBar,
     QPushButton,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
     QTableWidget,
     QTableWidgetItem,
     QVBoxLayout,
@@ -29,45 +44,109 @@ from main import (
 
 DB_FILE = "profiles.db"
 
+UPDATE_LABEL = "Update"
+
+# How long closing the window waits for running downloads, in milliseconds
+CLOSE_WAIT_MS = 5000
+
+# SQL reused on every call, so sqlite3's statement cache hits instead of re-parsing
+SQL_SELECT_AUTO_UPDATE_INTERVAL = "SELECT value FROM settings WHERE key = 'auto_update_interval'"
+SQL_UPDATE_AUTO_UPDATE_INTERVAL = "INSERT OR REPLACE INTO settings (key, value) VALUES ('auto_update_interval', ?)"
+SQL_SELECT_PROFILES_REFRESH = "SELECT profile_name, last_updated FROM profiles"
+SQL_SELECT_PROFILES = "SELECT profile_name, last_updated, status FROM profiles"
+SQL_SELECT_PROFILE_NAMES = "SELECT profile_name FROM profiles"
+SQL_SELECT_LAST_UPDATED = "SELECT last_updated FROM profiles WHERE profile_name = ?"
+SQL_UPDATE_PROFILE = "UPDATE profiles SET last_updated = ?, status = ? WHERE profile_name = ?"
+
+# Regex for valid TikTok URLs (profile, video, and short links)
+_TIKTOK_URL_RE = re.compile(
+    r"^(https?:\/\/)?(www\.)?tiktok\.com\/(@[\w.-]+(\/video\/\d+)?|[\w/-]+)(\?.*)?$"
+    r"|^(https?:\/\/)?vm\.tiktok\.com\/[\w/-]+\/?$"
+)
+
+# Regex for TikTok profile usernames (e.g., @username)
+_TIKTOK_PROFILE_RE = re.compile(r"^@[\w.-]+$")
 
-class DownloadWorker(QThread):
+
+class WorkerSignals(QObject):
     finished = pyqtSignal(str, str, str)
 
+
+class DownloadRunnable(QRunnable):
     def __init__(self, profile_name, output_folder):
         super().__init__()
         self.profile_name = profile_name
         self.output_folder = output_folder
+        self.signals = WorkerSignals()
 
     def run(self):
         url = f"https://www.tiktok.com/@{self.profile_name}"
         download_tiktok_profile(url)
         last_updated = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
-        self.finished.emit(self.profile_name, last_updated, "Updated")
-
+        self.signals.finished.emit(self.profile_name, last_updated, "Updated")
 
-class VideoDownloadWorker(QThread):
-    finished = pyqtSignal(str, str, str)
 
+class VideoDownloadRunnable(QRunnable):
     def __init__(self, url, output_folder):
         super().__init__()
         self.url = url
         self.output_folder = output_folder
+        self.signals = WorkerSignals()
 
     def run(self):
         metadata = download_tiktok_video(self.url, self.output_folder, [])
         if metadata:
             last_updated = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
-            self.finished.emit(metadata["uploader"], last_updated, "Downloaded")
+            self.signals.finished.emit(metadata["uploader"], last_updated, "Downloaded")
+
+
+class UpdateButtonDelegate(QStyledItemDelegate):
+    """Paints the per-row "Update" button from the item's Qt.UserRole label and forwards clicks."""
+
+    def __init__(self, gui):
+        super().__init__(gui)
+        self.gui = gui
+
+    def _button_option(self, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect
+        button.text = index.data(Qt.UserRole) or UPDATE_LABEL
+        button.state = QStyle.State_Enabled if button.text == UPDATE_LABEL else QStyle.State_None
+        return button
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, self._button_option(option, index), painter, option.widget)
+
+    def sizeHint(self, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        button = self._button_option(option, index)
+        text_size = option.fontMetrics.size(Qt.TextShowMnemonic, button.text)
+        return style.sizeFromContents(QStyle.CT_PushButton, button, text_size, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if (
+            event.type() == QEvent.MouseButtonRelease
+            and event.button() == Qt.LeftButton
+            and (index.data(Qt.UserRole) or UPDATE_LABEL) == UPDATE_LABEL
+        ):
+            profile_name = model.index(index.row(), 0).data()
+            self.gui.update_profile(profile_name, index.row() + 1)
+            return True
+        return super().editorEvent(event, model, option, index)
 
 
 class TikTokDownloaderGUI(QWidget):
     def __init__(self):
         super().__init__()
-        self.active_threads = []
+        # Shared, bounded pool for all download jobs
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(min(4, QThread.idealThreadCount()))
         self.selected_interval = 0  # Initialize selected interval
         self.auto_update_timer = None  # Initialize timer
         self.refresh_table_timer = None  # Global refresher timer
-        self.auto_update_actions = []  # Store menu actions
+        self._action_by_interval = {}  # Store menu actions by interval
+        self._current_interval_action = None  # Currently checked auto update action
 
         self.setWindowTitle("TikTok Video Downloader")
         self.setWindowIcon(QIcon("icon.png"))
@@ -87,7 +166,8 @@ class TikTokDownloaderGUI(QWidget):
 
         self.init_db()
 
-        self.update_buttons = {}
+        self._row_by_name = {}  # profile_name -> table row
+        self._pending_updates = []  # (last_updated, status, profile_name) awaiting _flush_updates
 
         self.init_ui()
 
@@ -104,8 +184,8 @@ class TikTokDownloaderGUI(QWidget):
 
     def load_auto_update_interval(self):
         """Load the auto-update interval from the database and set it globally."""
-        self.cursor.execute("SELECT auto_update_interval FROM profiles WHERE profile_name = 'global'")
-        result = self.cursor.fetchone()
+        with self._db_lock:
+            result = self._exec(SQL_SELECT_AUTO_UPDATE_INTERVAL).fetchone()
         if result:
             self.selected_interval = result[0]
         self.set_auto_update(self.selected_interval)  # Apply the saved interval globally
@@ -120,22 +200,32 @@ class TikTokDownloaderGUI(QWidget):
 
     def refresh_table(self):
         """Refresh the 'Last Update' column in the table by fetching the latest data."""
-        self.cursor.execute("SELECT profile_name, last_updated FROM profiles")
-        profiles = self.cursor.fetchall()
+        with self._db_lock:
+            profiles = self._exec(SQL_SELECT_PROFILES_REFRESH).fetchall()
+        now = QDateTime.currentDateTime()
         for profile_name, last_updated in profiles:
-            row = self.find_row_by_profile_name(profile_name)
-            if row != -1:
-                self.profile_table.setItem(row, 1, QTableWidgetItem(self.relative_time(last_updated)))
+            row = self._row_by_name.get(profile_name, -1)
+            if row == -1:
+                continue
+            self._set_cell_text(row, 1, self._relative_time(last_updated, now))
 
     def init_db(self):
-        self.conn = sqlite3.connect(DB_FILE)
+        # Serializes access to the shared connection/cursor across threads
+        self._db_lock = threading.RLock()
+        self.conn = sqlite3.connect(DB_FILE, isolation_level=None, check_same_thread=False, cached_statements=128)
         self.cursor = self.conn.cursor()
 
-        self.check_and_migrate_db()
+        # Tune the database once per session: WAL + relaxed sync avoids an fsync per write,
+        # and the mmap/page cache keeps the periodic table refreshes in memory
+        self.cursor.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-8192;
+            PRAGMA temp_store=MEMORY;
+        """)
 
-        self.conn = sqlite3.connect(DB_FILE)
-        self.cursor = self.conn.cursor()
-        self.cursor.execute("""
+        self._exec("""
             CREATE TABLE IF NOT EXISTS profiles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 profile_name TEXT NOT NULL,
@@ -144,19 +234,46 @@ class TikTokDownloaderGUI(QWidget):
                 auto_update_interval INTEGER DEFAULT 0
             )
         """)
-        self.conn.commit()
+        self._exec("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        """)
+
+        self.check_and_migrate_db()
+
+        # Index the lookup column used by every per-profile SELECT/UPDATE
+        try:
+            self._exec("CREATE UNIQUE INDEX IF NOT EXISTS idx_profiles_name ON profiles(profile_name)")
+        except sqlite3.IntegrityError:
+            # Older databases may hold duplicate names; fall back to a plain index
+            self._exec("CREATE INDEX IF NOT EXISTS idx_profiles_name ON profiles(profile_name)")
+
+    def _exec(self, sql, params=()):
+        """Execute a statement on the shared cursor while holding the database lock."""
+        with self._db_lock:
+            return self.cursor.execute(sql, params)
 
     def check_and_migrate_db(self):
-        """Check if the 'auto_update_interval' column exists and add it if necessary."""
+        """Add the 'auto_update_interval' column if necessary and migrate the legacy 'global' row."""
         # Query to get the current columns in the 'profiles' table
-        self.cursor.execute("PRAGMA table_info(profiles)")
-        columns = [column[1] for column in self.cursor.fetchall()]
+        with self._db_lock:
+            columns = [column[1] for column in self._exec("PRAGMA table_info(profiles)").fetchall()]
 
         # If the 'auto_update_interval' column does not exist, add it
         if "auto_update_interval" not in columns:
             print("Column 'auto_update_interval' does not exist, adding it...")
-            self.cursor.execute("ALTER TABLE profiles ADD COLUMN auto_update_interval INTEGER DEFAULT 0")
-            self.conn.commit()
+            self._exec("ALTER TABLE profiles ADD COLUMN auto_update_interval INTEGER DEFAULT 0")
+
+        # Move the legacy 'global' settings row out of the profiles table
+        self.cursor.executescript("""
+            BEGIN;
+            INSERT OR IGNORE INTO settings (key, value)
+                SELECT 'auto_update_interval', auto_update_interval FROM profiles WHERE profile_name = 'global';
+            DELETE FROM profiles WHERE profile_name = 'global';
+            COMMIT;
+        """)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -186,14 +303,14 @@ class TikTokDownloaderGUI(QWidget):
             43200000: "Every 12 hours",
             86400000: "Every 24 hours",
         }
-        self.auto_update_actions = []
+        self._action_by_interval = {}
 
         for interval, label in self.interval_labels.items():
             action = QAction(label, self, checkable=True)
             action.setData(interval)
             action.triggered.connect(lambda checked, i=interval: self.set_auto_update(i))
             auto_update_menu.addAction(action)
-            self.auto_update_actions.append(action)
+            self._action_by_interval[interval] = action
 
         # Initialize the selection (if any), delayed until after full initialization
         QTimer.singleShot(0, self._initialize_auto_update)
@@ -213,6 +330,13 @@ class TikTokDownloaderGUI(QWidget):
         layout.addWidget(self.url_input_label)
 
         url_layout = QHBoxLayout()
+
+        # Debounce validation so fast typing/pasting only validates once per pause
+        self._validate_timer = QTimer(self)
+        self._validate_timer.setSingleShot(True)
+        self._validate_timer.setInterval(150)
+        self._validate_timer.timeout.connect(self._do_validate_url_input)
+
         self.url_input = QLineEdit(self)
         self.url_input.textChanged.connect(self.validate_url_input)  # Connect input validation
         self.download_button = QPushButton("Download Video", self)
@@ -230,6 +354,7 @@ class TikTokDownloaderGUI(QWidget):
         self.profile_table.setHorizontalHeaderLabels(["Profile Name", "Last Update", "Status", ""])
         self.profile_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.profile_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.profile_table.setItemDelegateForColumn(3, UpdateButtonDelegate(self))
         self.load_profiles()
         layout.addWidget(self.profile_table)
 
@@ -247,13 +372,7 @@ class TikTokDownloaderGUI(QWidget):
         self.selected_interval = interval
 
         # Save the selected interval globally in the database
-        self.cursor.execute(
-            """
-            UPDATE profiles SET auto_update_interval = ? WHERE profile_name = 'global'
-        """,
-            (interval,),
-        )
-        self.conn.commit()
+        self._exec(SQL_UPDATE_AUTO_UPDATE_INTERVAL, (interval,))
 
         # Stop any existing auto-update timers if they exist
         if self.auto_update_timer:
@@ -266,22 +385,19 @@ class TikTokDownloaderGUI(QWidget):
             self.auto_update_timer.start(interval)
 
         # Update the menu actions to reflect the selected option
-        for action in self.auto_update_actions:
-            action.setChecked(action.data() == interval)
+        if self._current_interval_action:
+            self._current_interval_action.setChecked(False)
+        self._current_interval_action = self._action_by_interval.get(interval)
+        if self._current_interval_action:
+            self._current_interval_action.setChecked(True)
 
     def validate_url_input(self):
-        text = self.url_input.text().strip()
+        self._validate_timer.start()
 
-        # Regex for valid TikTok URLs (profile, video, and short links)
-        tiktok_url_pattern = re.compile(
-            r"^(https?:\/\/)?(www\.)?tiktok\.com\/(@[\w.-]+(\/video\/\d+)?|[\w/-]+)(\?.*)?$"
-            r"|^(https?:\/\/)?vm\.tiktok\.com\/[\w/-]+\/?$"
-        )
-
-        # Regex for TikTok profile usernames (e.g., @username)
-        tiktok_profile_pattern = re.compile(r"^@[\w.-]+$")
+    def _do_validate_url_input(self):
+        text = self.url_input.text().strip()
 
-        if tiktok_url_pattern.match(text) or tiktok_profile_pattern.match(text):
+        if _TIKTOK_URL_RE.match(text) or _TIKTOK_PROFILE_RE.match(text):
             self.download_button.setEnabled(True)
         else:
             self.download_button.setEnabled(False)
@@ -292,27 +408,35 @@ class TikTokDownloaderGUI(QWidget):
             self.output_folder = folder  # Update stored output folder
 
     def load_profiles(self):
-        self.cursor.execute("SELECT profile_name, last_updated, status FROM profiles")
-        profiles = self.cursor.fetchall()
-        self.profile_table.setRowCount(len(profiles))
-        for i, profile in enumerate(profiles):
-            profile_name, last_updated, status = profile
-            self.profile_table.setItem(i, 0, QTableWidgetItem(profile_name))
-            self.profile_table.setItem(i, 1, QTableWidgetItem(self.relative_time(last_updated)))
-            self.profile_table.setItem(i, 2, QTableWidgetItem(status))
-
-            update_button = QPushButton("Update", self)
-            update_button.setFixedSize(update_button.sizeHint())
-            update_button.clicked.connect(lambda _, name=profile_name, idx=i+1: self.update_profile(name, idx))
-            self.profile_table.setCellWidget(i, 3, update_button)
-
-            self.update_buttons[profile_name] = update_button  # Store button reference
-
-    def relative_time(self, timestamp):
+        with self._db_lock:
+            profiles = self._exec(SQL_SELECT_PROFILES).fetchall()
+        # Suspend repaints and signals so the bulk insert relayouts once
+        self.profile_table.setUpdatesEnabled(False)
+        self.profile_table.blockSignals(True)
+        try:
+            self.profile_table.setRowCount(len(profiles))
+            self._row_by_name = {}
+            now = QDateTime.currentDateTime()
+            for i, profile in enumerate(profiles):
+                profile_name, last_updated, status = profile
+                self._row_by_name[profile_name] = i
+                self.profile_table.setItem(i, 0, QTableWidgetItem(profile_name))
+                self.profile_table.setItem(i, 1, QTableWidgetItem(self._relative_time(last_updated, now)))
+                self.profile_table.setItem(i, 2, QTableWidgetItem(status))
+
+                # Painted by UpdateButtonDelegate
+                button_item = QTableWidgetItem()
+                button_item.setData(Qt.UserRole, UPDATE_LABEL)
+                self.profile_table.setItem(i, 3, button_item)
+        finally:
+            self.profile_table.blockSignals(False)
+            self.profile_table.setUpdatesEnabled(True)
+            self.profile_table.viewport().update()
+
+    def _relative_time(self, timestamp, now):
         last_updated = QDateTime.fromString(timestamp, "yyyy-MM-dd HH:mm:ss")
         if not last_updated.isValid():
             return timestamp
-        now = QDateTime.currentDateTime()
         secs_diff = last_updated.secsTo(now)
         if secs_diff < 60:
             if secs_diff == 0:
@@ -327,8 +451,8 @@ class TikTokDownloaderGUI(QWidget):
 
     def get_last_updated(self, profile_name):
         """Retrieve the last updated timestamp for a profile."""
-        self.cursor.execute("SELECT last_updated FROM profiles WHERE profile_name = ?", (profile_name,))
-        result = self.cursor.fetchone()
+        with self._db_lock:
+            result = self._exec(SQL_SELECT_LAST_UPDATED, (profile_name,)).fetchone()
         if result:
             return QDateTime.fromString(result[0], "yyyy-MM-dd HH:mm:ss")
         return QDateTime()
@@ -339,16 +463,13 @@ class TikTokDownloaderGUI(QWidget):
         if not url or not output_folder:
             return
         self.download_button.setEnabled(False)
-        worker = VideoDownloadWorker(url, output_folder)
-        worker.finished.connect(self.on_video_download_finished)
-        worker.finished.connect(self.update_profile_table)
-        worker.start()
-        self.active_threads.append(worker)
+        runnable = VideoDownloadRunnable(url, output_folder)
+        runnable.signals.finished.connect(self.on_video_download_finished)
+        runnable.signals.finished.connect(self.update_profile_table)
+        self.pool.start(runnable)
 
     def update_profile(self, profile_name, index):
-        if profile_name in self.update_buttons:
-            self.update_buttons[profile_name].setDisabled(True)
-            self.update_buttons[profile_name].setText(f"In queue ({index})")
+        self._set_button_label(profile_name, f"In queue ({index})")
         self.update_queue.put(profile_name)
         self.process_queue()
 
@@ -356,70 +477,92 @@ class TikTokDownloaderGUI(QWidget):
         if self.current_worker is None and not self.update_queue.empty():
             profile_name = self.update_queue.get()
             self.update_status(profile_name, "Being Updated...")
-            self.current_worker = DownloadWorker(profile_name, self.output_folder)
-            self.current_worker.finished.connect(self.on_update_finished)
-            self.current_worker.start()
+            self.current_worker = DownloadRunnable(profile_name, self.output_folder)
+            self.current_worker.signals.finished.connect(self.on_update_finished)
+            self.pool.start(self.current_worker)
 
     def on_update_finished(self, profile_name, last_updated, status):
         self.update_profile_table(profile_name, last_updated, status)
 
         # Re-enable the button after the update finishes
-        if profile_name in self.update_buttons:
-            self.update_buttons[profile_name].setDisabled(False)
-            self.update_buttons[profile_name].setText("Update")
+        self._set_button_label(profile_name, UPDATE_LABEL)
 
         self.current_worker = None
         self.process_queue()
 
     def on_video_download_finished(self, profile_name, last_updated, status):
         self.update_profile_table(profile_name, last_updated, status)
-        self.cleanup_threads()
         self.download_button.setEnabled(True)
         self.url_input.clear()
 
-    def cleanup_threads(self):
-        for thread in self.active_threads:
-            thread.quit()
-            thread.wait()
-        self.active_threads = []
-
     def closeEvent(self, event):
         """Ensure all threads and timers are stopped when closing."""
         if self.auto_update_timer:
             self.auto_update_timer.stop()
-        for thread in self.active_threads:
-            thread.wait()
+        # Don't freeze the window until a long profile update finishes; give running jobs a bounded grace period
+        if not self.pool.waitForDone(CLOSE_WAIT_MS):
+            print("Downloads still running, closing without waiting for them to finish.")
+        # Deliver queued worker signals so their updates reach _pending_updates before the flush
+        QCoreApplication.sendPostedEvents()
+        self._flush_updates()
         event.accept()
 
     def update_all_profiles(self):
-        self.cursor.execute("SELECT profile_name FROM profiles")
-        profiles = self.cursor.fetchall()
-        for profile in profiles:
-            self.update_profile(profile[0])
+        with self._db_lock:
+            profiles = self._exec(SQL_SELECT_PROFILE_NAMES).fetchall()
+        for index, (profile_name,) in enumerate(profiles, start=1):
+            self.update_profile(profile_name, index)
 
     def update_profile_table(self, profile_name, last_updated, status):
-        self.cursor.execute(
-            """UPDATE profiles SET last_updated = ?, status = ? WHERE profile_name = ?""",
-            (last_updated, status, profile_name),
-        )
-        self.conn.commit()
+        """Queue a profile update; updates arriving close together are written in one transaction."""
+        if not self._pending_updates:
+            QTimer.singleShot(50, self._flush_updates)
+        self._pending_updates.append((last_updated, status, profile_name))
 
-        # Find the row of the updated profile
+    def _flush_updates(self):
+        if not self._pending_updates:
+            return
+        updates, self._pending_updates = self._pending_updates, []
+
+        with self._db_lock:
+            self._exec("BEGIN IMMEDIATE")
+            try:
+                self.cursor.executemany(SQL_UPDATE_PROFILE, updates)
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+        now = QDateTime.currentDateTime()
+        for last_updated, status, profile_name in updates:
+            # Find the row of the updated profile
+            row = self.find_row_by_profile_name(profile_name)
+            if row != -1:
+                self._set_cell_text(row, 1, self._relative_time(last_updated, now))
+                self._set_cell_text(row, 2, status)
+
+    def update_status(self, profile_name, status):
         row = self.find_row_by_profile_name(profile_name)
         if row != -1:
-            self.profile_table.setItem(row, 1, QTableWidgetItem(self.relative_time(last_updated)))
-            self.profile_table.setItem(row, 2, QTableWidgetItem(status))
+            self._set_cell_text(row, 2, status)
 
-    def update_status(self, profile_name, status):
+    def _set_button_label(self, profile_name, label):
         row = self.find_row_by_profile_name(profile_name)
         if row != -1:
-            self.profile_table.setItem(row, 2, QTableWidgetItem(status))
+            item = self.profile_table.item(row, 3)
+            if item:
+                item.setData(Qt.UserRole, label)
+
+    def _set_cell_text(self, row, column, text):
+        """Update a cell in place, only creating an item if the cell is still empty."""
+        item = self.profile_table.item(row, column)
+        if item:
+            item.setText(text)
+        else:
+            self.profile_table.setItem(row, column, QTableWidgetItem(text))
 
     def find_row_by_profile_name(self, profile_name):
-        for row in range(self.profile_table.rowCount()):
-            if self.profile_table.item(row, 0).text() == profile_name:
-                return row
-        return -1
+        return self._row_by_name.get(profile_name, -1)
 
 
 def main():
@@ -1,4 +1,5 @@
 import argparse
+import functools
 import json
 import logging
 import os
@@ -6,7 +7,7 @@ import re
 import shutil
 import subprocess
 import sys
-import time
+import tempfile
 import winreg
 from datetime import datetime
 
@@ -27,6 +28,19 @@ exe_name = "yt-dlp"
 exe_path = shutil.which(exe_name)
 logging.debug(f"yt-dlp executable path: {exe_path}")
 
+# Regular expression to match YYYYMMDD date format
+_DATE_RE = re.compile(r"(^|\_)(\d{8})(\_|$)")
+
+# Let yt-dlp's own metadata postprocessor write the title/artist/description/date tags,
+# saving a separate ffmpeg process per video
+_EMBED_METADATA_ARGS = [
+    "--embed-metadata",
+    "--parse-metadata",
+    "description:(?s)(?P<meta_description>.+)",
+    "--parse-metadata",
+    "uploader:%(artist)s",
+]
+
 
 def is_valid_date(date_str):
     """Checks if the string is a valid date in YYYYMMDD format."""
@@ -37,6 +51,7 @@ def is_valid_date(date_str):
         return False
 
 
+@functools.lru_cache(maxsize=8)
 def get_user_folder(folder_name):
     """Returns the actual folder path set by the user in Windows registry."""
     try:
@@ -50,10 +65,12 @@ def get_user_folder(folder_name):
         return os.path.join(os.path.expanduser("~"), folder_name)  # Fallback
 
 
+@functools.lru_cache(maxsize=1)
 def get_downloads_folder():
     return get_user_folder("{374DE290-123F-4565-9164-39C4925E467B}")
 
 
+@functools.lru_cache(maxsize=1)
 def get_videos_folder():
     return os.path.join(get_user_folder("My Video"), "4K Tokkit")
 
@@ -80,39 +97,6 @@ def get_video_info(url):
         return None, None
 
 
-def embed_metadata(video_path, metadata):
-    """Uses ffmpeg to embed metadata into the video file."""
-    if not os.path.exists(video_path):
-        logger.info(f"Error: Video file '{video_path}' not found.")
-        return
-
-    title = metadata.get("title", "Unknown Title")
-    uploader = metadata.get("uploader", "Unknown Uploader")
-    description = metadata.get("description", "").replace("\n", " ")
-    upload_date = metadata.get("upload_date", "Unknown Date")
-
-    metadata_cmd = [
-        "ffmpeg",
-        "-i",
-        video_path,
-        "-metadata",
-        f"title={title}",
-        "-metadata",
-        f"artist={uploader}",
-        "-metadata",
-        f"description={description}",
-        "-metadata",
-        f"date={upload_date}",
-        "-codec",
-        "copy",
-        video_path.replace(".mp4", "_meta.mp4"),
-    ]
-
-    subprocess.run(metadata_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    os.replace(video_path.replace(".mp4", "_meta.mp4"), video_path)
-    logger.info(f"✅ Metadata embedded in: {video_path}")
-
-
 def download_tiktok_video(url, output_folder, failed_urls):
     """Downloads a single TikTok video with metadata."""
     os.makedirs(output_folder, exist_ok=True)
@@ -133,6 +117,7 @@ def download_tiktok_video(url, output_folder, failed_urls):
         output_path,
         "--merge-output-format",
         "mp4",
+        *_EMBED_METADATA_ARGS,
         url,
     ]
     result = subprocess.run(command)
@@ -141,10 +126,57 @@ def download_tiktok_video(url, output_folder, failed_urls):
         failed_urls.append(url)
         return None
 
-    embed_metadata(output_path, metadata)
     return metadata
 
 
+def download_tiktok_batch(urls, output_folder):
+    """Downloads several TikTok videos with a single yt-dlp process.
+
+    Yields the id of each video as soon as it has been downloaded successfully.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as batch:
+        batch.write("\n".join(urls) + "\n")
+        batch_file = batch.name
+
+    command = [
+        exe_path,
+        "--batch-file",
+        batch_file,
+        "--ignore-errors",
+        "--no-simulate",
+        # Print the id once each video has been written to its final path
+        "--print",
+        "after_move:id",
+        # Wait a random 0.5-0.75 seconds before each download
+        "--min-sleep-interval",
+        "0.5",
+        "--max-sleep-interval",
+        "0.75",
+        *_EMBED_METADATA_ARGS,
+        "--replace-in-metadata",
+        "uploader",
+        " ",
+        "_",
+        "-f",
+        "bestvideo+bestaudio/best",
+        "-o",
+        os.path.join(output_folder, "%(uploader)s_%(upload_date)s_%(id)s.%(ext)s"),
+        "--merge-output-format",
+        "mp4",
+    ]
+    try:
+        # stderr is left on the console so yt-dlp's error messages stay visible
+        with subprocess.Popen(command, stdout=subprocess.PIPE, text=True, bufsize=1) as proc:
+            for line in proc.stdout:
+                video_id = line.strip()
+                if video_id:
+                    yield video_id
+    finally:
+        os.remove(batch_file)
+
+
 def download_tiktok_profile(url):
     """Downloads all missing videos from a TikTok profile."""
     profile_name = url.split("/@")[1].split("/")[0]
@@ -156,57 +188,74 @@ def download_tiktok_profile(url):
 
     history_file = os.path.join(profile_folder, "downloaded_videos.txt")
 
-    existing_videos = set()
+    history_ids = set()
     if os.path.exists(history_file):
         with open(history_file, "r") as file:
-            # Regular expression to match YYYYMMDD date format
-            date_pattern = re.compile(r"(^|\_)(\d{8})(\_|$)")
+            history_ids = {line.strip() for line in file if line.strip()}
 
-            # Check only the files in the main profile folder, not subfolders
-            for line in file:
-                video_id = line.strip()
-                for filename in os.listdir(profile_folder):
-                    file_path = os.path.join(profile_folder, filename)
-                    # Ensure we're not going into subfolders by checking if it's a file
-                    if os.path.isfile(file_path) and video_id in filename and filename.endswith(".mp4"):
-                        # Look for date pattern
-                        date_match = date_pattern.search(filename)
-                        if date_match:
-                            date_str = date_match.group(2)  # Extract the matched date (YYYYMMDD)
-                            if is_valid_date(date_str):  # Validate the date
-                                existing_videos.add(video_id)
-                            else:
-                                logger.info(f"File {filename} contains an invalid date, treating it as missing.")
-                        else:
-                            logger.debug(f"File {filename} is missing a valid date, treating it as missing.")
+    existing_videos = set()
+    if history_ids:
+        # Check only the files in the main profile folder (not subfolders), keyed by the video id suffix
+        with os.scandir(profile_folder) as entries:
+            for entry in entries:
+                filename = entry.name
+                if not filename.endswith(".mp4") or not entry.is_file():
+                    continue
+                video_id = filename[: -len(".mp4")].rsplit("_", 1)[-1]
+                if video_id not in history_ids:
+                    continue
+                # Look for date pattern
+                date_match = _DATE_RE.search(filename)
+                if not date_match:
+                    logger.debug(f"File {filename} is missing a valid date, treating it as missing.")
+                    continue
+                date_str = date_match.group(2)  # Extract the matched date (YYYYMMDD)
+                if not is_valid_date(date_str):  # Validate the date
+                    logger.info(f"File {filename} contains an invalid date, treating it as missing.")
+                    continue
+                existing_videos.add(video_id)
 
     command = [exe_path, "--flat-playlist", "--dump-json", url]
-    result = subprocess.run(command, capture_output=True, text=True)
 
-    if result.returncode != 0:
+    # yt-dlp emits one JSON object per line; parse the feed as it streams in
+    missing_videos = {}  # video_id -> url, in feed order
+    feed_size = 0
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1) as proc:
+        for line in proc.stdout:
+            if not line.strip():
+                continue
+            feed_size += 1
+            video = json.loads(line)
+            video_id = video.get("id")
+            if video_id not in existing_videos:
+                missing_videos[video_id] = video.get("url")
+
+    if proc.returncode != 0:
         logger.info("Failed to retrieve profile videos.")
         return
 
-    videos = [json.loads(line) for line in result.stdout.splitlines()]
-
-    failed_urls = []  # List to collect failed video URLs
-    for video in videos:
-        video_id = video.get("id")
-        if video_id not in existing_videos:
-            video_url = video.get("url")
-            logger.info(f"Downloading new video: {video_url}")
+    if not feed_size:
+        logger.info("No videos found on the profile.")
+        return
 
-            # Wait 0.5 seconds before downloading
-            time.sleep(0.5)
+    if not missing_videos:
+        logger.info("No new videos to download.")
+        return
 
-            metadata = download_tiktok_video(video_url, profile_folder, failed_urls)
-            if metadata:  # Only add to history if download is successful
-                with open(history_file, "a") as file:
-                    file.write(video_id + "\n")
+    logger.info(f"Downloading {len(missing_videos)} new video(s)...")
+    downloaded = set()
+    with open(history_file, "a") as file:
+        # Only add to history once each download has succeeded
+        for video_id in download_tiktok_batch(list(missing_videos.values()), profile_folder):
+            downloaded.add(video_id)
+            file.write(video_id + "\n")
+            file.flush()
 
+    failed_urls = [video_url for video_id, video_url in missing_videos.items() if video_id not in downloaded]
     if failed_urls:
         with open(failed_urls_file, "w") as f:
             for url in failed_urls:
+                logger.info(f"Failed to download video: {url}")
                 f.write(url + "\n")
 
 